@@ -7,19 +7,19 @@ import os
 import re
 import time
 from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date
 from urllib.parse import urlparse, urljoin
 
-import yaml
-
-from src.collect.web_fetch import make_session, fetch_url
-from src.collect.discover_links import extract_links, same_domain
+from src.collect.web_fetch import make_session, fetch_url, fetch_url_bytes
+from src.collect.discover_links import extract_links_bytes, norm_host
 from src.parse.html_parser import parse_page
-from src.extract.extractor_ai import extract_event_fields
-from src.geocode.geocoder import geocode_event, load_geocode_cache, save_geocode_cache
-from src.media.image_processor import download_and_process_image
+from src.extract.extractor_ai import extract_event_fields_batch
+from src.geocode.geocoder import geocode_events
+from src.media.image_processor import download_images_batch
 from src.export.to_csv import export_master_csv, export_umap_csv, export_sin_coord_csv
 from src.collect.sources_loader import load_sources, should_include_social_seeds
+from src.collect.web_search import load_yaml
 
 
 # =========================
@@ -40,7 +40,6 @@ EXPORT_UMAP = "data/exports/mapa_8m_global_umap.csv"
 EXPORT_SIN_COORD = "data/exports/mapa_8m_global_sin_coord.csv"
 
 IMAGES_DIR = "data/images"
-GEOCODE_CACHE_PATH = "data/processed/geocode_cache.json"
 
 
 # =========================
@@ -62,6 +61,15 @@ THRESHOLD_EXPORT_UMAP = int(os.environ.get("THRESHOLD_EXPORT_UMAP", "7"))
 
 MIN_EVENT_DATE = date.fromisoformat(os.environ.get("MIN_EVENT_DATE", "2025-01-01"))
 
+EXTRACT_BATCH_SIZE = int(os.environ.get("EXTRACT_BATCH_SIZE", "32"))
+# >1: parse+extract en un pool de procesos (CPU-bound); 1 = secuencial
+EXTRACT_WORKERS = int(os.environ.get("EXTRACT_WORKERS", "1"))
+# descargas de imágenes en paralelo (threads, I/O)
+IMAGE_WORKERS = int(os.environ.get("IMAGE_WORKERS", "8"))
+
+
+_RE_OG_IMAGE = re.compile(r'<meta[^>]+property=["\']og:image["\'][^>]+content=["\']([^"\']+)["\']', re.I)
+
 
 # =========================
 # Utils
@@ -90,9 +98,8 @@ def dedupe(items: list[str]) -> list[str]:
 def normalize(s: str) -> str:
     if not s:
         return ""
-    s=str(s).replace("\u00a0"," ")
-    s=re.sub(r"\s+"," ",s).strip()
-    return s
+    # split() sin args ya corta en cualquier whitespace unicode (incluye \u00a0)
+    return " ".join(str(s).split())
 
 
 # =========================
@@ -101,9 +108,31 @@ def normalize(s: str) -> str:
 def load_domain_rules() -> dict:
     if not os.path.exists(DOMAIN_RULES_YML):
         return {}
-    with open(DOMAIN_RULES_YML,"r",encoding="utf-8") as f:
-        y=yaml.safe_load(f)
-        return y if isinstance(y,dict) else {}
+    y=load_yaml(DOMAIN_RULES_YML)
+    return y if isinstance(y,dict) else {}
+
+
+def _compile_contains(patterns) -> re.Pattern | None:
+    pats=[p.lower() for p in (patterns or []) if isinstance(p,str) and p]
+    if not pats:
+        return None
+    return re.compile("|".join(map(re.escape,pats)))
+
+
+# (rules, deny_re, allow_re): se compila una vez por dict de reglas
+_RULES_RE: tuple = (None, None, None)
+
+
+def _rules_regexes(rules: dict):
+    global _RULES_RE
+    if _RULES_RE[0] is not rules:
+        global_rules = rules.get("global", {}) if isinstance(rules.get("global"),dict) else {}
+        _RULES_RE=(
+            rules,
+            _compile_contains(global_rules.get("deny_url_contains", [])),
+            _compile_contains(global_rules.get("allow_url_contains", [])),
+        )
+    return _RULES_RE[1], _RULES_RE[2]
 
 
 def url_allowed_by_rules(rules: dict, url: str) -> bool:
@@ -112,20 +141,15 @@ def url_allowed_by_rules(rules: dict, url: str) -> bool:
 
     u=(url or "").lower()
 
-    global_rules = rules.get("global", {}) if isinstance(rules.get("global"),dict) else {}
+    # una alternancia compilada en vez de N chequeos `pat in u` por URL
+    deny_re, allow_re = _rules_regexes(rules)
 
-    deny = global_rules.get("deny_url_contains", [])
-    for pat in deny:
-        if isinstance(pat,str) and pat.lower() in u:
-            return False
-
-    allow = global_rules.get("allow_url_contains", [])
-    if allow:
-        for pat in allow:
-            if isinstance(pat,str) and pat.lower() in u:
-                return True
+    if deny_re and deny_re.search(u):
         return False
 
+    if allow_re:
+        return bool(allow_re.search(u))
+
     return True
 
 
@@ -152,7 +176,7 @@ def read_sources_merged():
         if should_include_social_seeds():
             seeds_all.extend(bundle.social_urls)
 
-        y=yaml.safe_load(open(p,"r",encoding="utf-8"))
+        y=load_yaml(p)
         if isinstance(y,dict) and isinstance(y.get("seeds"),dict):
             for region,topics in y["seeds"].items():
                 for tema,node in topics.items():
@@ -174,13 +198,16 @@ def crawl_seed_bfs(session, seed, rules, depth, max_pages, global_seen, global_o
     q=deque([(seed,depth)])
     local_seen=set()
     added=0
+    seed_host=norm_host(seed)
+    if not seed_host:
+        return 0
     while q and added<max_pages and len(global_out)<global_cap:
         u,dleft=q.popleft()
         u=strip_fragment(u)
         if not u or u in local_seen:
             continue
         local_seen.add(u)
-        if not same_domain(seed,u):
+        if norm_host(u)!=seed_host:
             continue
         if not url_allowed_by_rules(rules,u):
             continue
@@ -190,49 +217,74 @@ def crawl_seed_bfs(session, seed, rules, depth, max_pages, global_seen, global_o
             added+=1
         if dleft<=1:
             continue
-        html=fetch_url(session,u,use_cache=True)
-        if not html:
+        raw=fetch_url_bytes(session,u,use_cache=True)
+        if not raw:
             continue
-        for link in extract_links(u,html):
+        for link in extract_links_bytes(u,raw):
             link=strip_fragment(link)
-            if link and same_domain(seed,link):
+            if link and norm_host(link)==seed_host:
                 q.append((link,dleft-1))
     return added
 
 
 # =========================
-# Popup builder
+# Fetch + parse + extract por lotes
 # =========================
-def build_umap_popup(ev: dict) -> str:
-    titulo = normalize(ev.get("convocatoria") or ev.get("colectiva") or "")
-    fecha = normalize(ev.get("fecha") or "")
-    hora = normalize(ev.get("hora") or "")
+def _parse_and_extract_batch(fetched):
+    # top-level para que sea picklable por ProcessPoolExecutor
+    return extract_event_fields_batch([parse_page(u,h) for u,h in fetched])
+
+
+def iter_extracted(session, urls, batch_size=EXTRACT_BATCH_SIZE, executor=None):
+    """
+    Descarga y parsea de a lotes y extrae cada lote con una sola llamada batch.
+    Con executor (ProcessPoolExecutor), cada lote se reparte entre los workers.
+    Yields (url, html, ev) solo para páginas con ev.
+    """
+    batch_size=max(1,int(batch_size))
+    for i in range(0,len(urls),batch_size):
+        fetched=[]
+        for url in urls[i:i+batch_size]:
+            html=fetch_url(session,url,use_cache=True)
+            if html:
+                fetched.append((url,html))
+        if not fetched:
+            continue
+        if executor is None:
+            evs=_parse_and_extract_batch(fetched)
+        else:
+            step=max(1,-(-len(fetched)//EXTRACT_WORKERS))
+            parts=[fetched[j:j+step] for j in range(0,len(fetched),step)]
+            evs=[ev for part in executor.map(_parse_and_extract_batch,parts) for ev in part]
+        for (url,html),ev in zip(fetched,evs):
+            if ev:
+                yield url,html,ev
 
-    when=""
-    if fecha and hora:
-        when=f"{fecha} - {hora}"
-    elif fecha:
-        when=fecha
-    elif hora:
-        when=hora
 
-    lines=[]
-    if titulo:
-        lines.append(f"## {titulo}")
-    if when:
-        lines.append(when)
+# =========================
+# Popup builder
+# =========================
+_PAGES_BASE_URL = "https://geochicas.github.io/8m-global-mapper/"
+
 
-    img=normalize(ev.get("imagen") or "")
-    if img:
-        if img.startswith("images/"):
-            img=f"https://geochicas.github.io/8m-global-mapper/{img}"
-        lines.append(f"{{{{{img}}}}}")
+def build_umap_popup(ev: dict) -> str:
+    g=ev.get
+    titulo=normalize(g("convocatoria") or g("colectiva") or "")
+    fecha=normalize(g("fecha") or "")
+    hora=normalize(g("hora") or "")
+    img=normalize(g("imagen") or "")
+    cta=normalize(g("cta_url") or "")
 
-    cta=normalize(ev.get("cta_url") or "")
-    if cta.startswith("http"):
-        lines.append(f"[[{cta}|Accede a la convocatoria]]")
+    if img.startswith("images/"):
+        img=_PAGES_BASE_URL+img
 
-    return "\n".join(lines).strip()
+    # líneas vacías se descartan; "fecha - hora" o la que haya
+    return "\n".join(filter(None,(
+        f"## {titulo}" if titulo else "",
+        " - ".join(filter(None,(fecha,hora))),
+        f"{{{{{img}}}}}" if img else "",
+        f"[[{cta}|Accede a la convocatoria]]" if cta.startswith("http") else "",
+    ))).strip()
 
 
 # =========================
@@ -271,7 +323,6 @@ _TLD_TO_COUNTRY = {
 def _infer_country_from_url(url: str) -> str:
     """Infiere el país desde el TLD del dominio."""
     try:
-        from urllib.parse import urlparse
         host = urlparse(url).netloc.lower().split(":")[0]
         if host.startswith("www."):
             host = host[4:]
@@ -287,7 +338,6 @@ def _infer_country_from_url(url: str) -> str:
 def _find_seed_meta_for_url(url: str, seed_meta: dict) -> dict:
     """Encuentra el seed_meta que corresponde a una URL de candidato."""
     try:
-        from urllib.parse import urlparse
         host = urlparse(url).netloc.lower()
         if host.startswith("www."):
             host = host[4:]
@@ -336,87 +386,91 @@ def main():
     print(f"🔎 Candidates total: {len(candidates)}")
 
     records=[]
-    geocode_cache=load_geocode_cache(GEOCODE_CACHE_PATH)
+    img_jobs=[]
 
     n_imgs=0
     n_geocoded=0
     n_low_score=0
     n_old_skip=0
 
-    for url in candidates:
-        html=fetch_url(session,url,use_cache=True)
-        if not html:
-            continue
-
-        parsed=parse_page(url,html)
-        ev=extract_event_fields(parsed)
-        if not ev:
-            continue
+    executor=ProcessPoolExecutor(max_workers=EXTRACT_WORKERS) if EXTRACT_WORKERS>1 else None
+    try:
+        extracted=iter_extracted(session,candidates,executor=executor)
+
+        for url,html,ev in extracted:
+            score=int(ev.get("score_relevancia") or 0)
+            if score<THRESHOLD_EXTRACT:
+                n_low_score+=1
+                continue
+
+            # fecha mínima
+            f=(ev.get("fecha") or "").strip()
+            if f:
+                try:
+                    dd=date.fromisoformat(f)
+                    if dd<MIN_EVENT_DATE:
+                        n_old_skip+=1
+                        continue
+                    ev["anio"]=str(dd.year)
+                except:
+                    pass
+
+            # Aplicar ciudad_default y pais_default desde seed_meta
+            seed_info = _find_seed_meta_for_url(url, seed_meta)
+            if seed_info:
+                if not (ev.get("ciudad") or "").strip() and seed_info.get("ciudad_default"):
+                    ev["ciudad"] = seed_info["ciudad_default"]
+                    # Limpiar coordenadas viejas para forzar re-geocodificación con ciudad correcta
+                    ev.pop("lat", None)
+                    ev.pop("lon", None)
+                if not (ev.get("pais") or "").strip() and seed_info.get("pais_default"):
+                    ev["pais"] = seed_info["pais_default"]
+
+            # Inferir país desde TLD si aún no tiene
+            if not (ev.get("pais") or "").strip():
+                pais_tld = _infer_country_from_url(url)
+                if pais_tld:
+                    ev["pais"] = pais_tld
+
+            # imagen fallback
+            img_url=(ev.get("imagen") or "").strip()
+            if not img_url:
+                m=_RE_OG_IMAGE.search(html)
+                if m:
+                    img_url=m.group(1).strip()
+
+            records.append(ev)
+
+            if img_url:
+                img_abs=urljoin(url,img_url)
+                if img_abs.startswith("//"):
+                    img_abs="https:"+img_abs
+                if img_abs.startswith("http"):
+                    # se baja después, en paralelo; el popup espera a tener la imagen
+                    img_jobs.append((ev,img_abs))
+                    continue
 
-        score=int(ev.get("score_relevancia") or 0)
-        if score<THRESHOLD_EXTRACT:
-            n_low_score+=1
-            continue
+            # popup armado acá: evita una pasada extra sobre records antes de exportar
+            ev["popup"]=build_umap_popup(ev)
+    finally:
+        # también si el loop corta por excepción: que no queden workers vivos
+        if executor is not None:
+            executor.shutdown()
 
-        # fecha mínima
-        f=(ev.get("fecha") or "").strip()
-        if f:
-            try:
-                dd=date.fromisoformat(f)
-                if dd<MIN_EVENT_DATE:
-                    n_old_skip+=1
-                    continue
-                ev["anio"]=str(dd.year)
-            except:
-                pass
-
-        # Aplicar ciudad_default y pais_default desde seed_meta
-        seed_info = _find_seed_meta_for_url(url, seed_meta)
-        if seed_info:
-            if not (ev.get("ciudad") or "").strip() and seed_info.get("ciudad_default"):
-                ev["ciudad"] = seed_info["ciudad_default"]
-                # Limpiar coordenadas viejas para forzar re-geocodificación con ciudad correcta
-                ev.pop("lat", None)
-                ev.pop("lon", None)
-            if not (ev.get("pais") or "").strip() and seed_info.get("pais_default"):
-                ev["pais"] = seed_info["pais_default"]
-
-        # Inferir país desde TLD si aún no tiene
-        if not (ev.get("pais") or "").strip():
-            pais_tld = _infer_country_from_url(url)
-            if pais_tld:
-                ev["pais"] = pais_tld
-
-        # geocode RESTAURADO
-        geo=geocode_event(ev,geocode_cache=geocode_cache)
+    # geocode en bulk: queries deduplicadas, una transacción para la caché
+    # (la caché vive en SQLite y geocode_events ya la vuelca al final)
+    for ev,geo in zip(records,geocode_events(records)):
         if geo and geo.get("lat") and geo.get("lon"):
             ev["lat"]=geo["lat"]
             ev["lon"]=geo["lon"]
             n_geocoded+=1
 
-        # imagen fallback
-        img_url=(ev.get("imagen") or "").strip()
-        if not img_url:
-            m=re.search(r'<meta[^>]+property=["\']og:image["\'][^>]+content=["\']([^"\']+)["\']',html,re.I)
-            if m:
-                img_url=m.group(1).strip()
-
-        if img_url:
-            img_abs=urljoin(url,img_url)
-            if img_abs.startswith("//"):
-                img_abs="https:"+img_abs
-            if img_abs.startswith("http"):
-                out=download_and_process_image(img_abs,out_dir=IMAGES_DIR)
-                if out and out.get("public_url"):
-                    ev["imagen"]=out["public_url"]
-                    n_imgs+=1
-
-        records.append(ev)
-
-    save_geocode_cache(GEOCODE_CACHE_PATH,geocode_cache)
-
-    for r in records:
-        r["popup"]=build_umap_popup(r)
+    outs=download_images_batch([u for _,u in img_jobs],out_dir=IMAGES_DIR,max_workers=IMAGE_WORKERS)
+    for (ev,_),out in zip(img_jobs,outs):
+        if out and out.get("public_url"):
+            ev["imagen"]=out["public_url"]
+            n_imgs+=1
+        ev["popup"]=build_umap_popup(ev)
 
     export_master_csv(EXPORT_MASTER,records)
     export_umap_csv(EXPORT_UMAP,records,min_score=THRESHOLD_EXPORT_UMAP)
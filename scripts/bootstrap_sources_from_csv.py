@@ -1,7 +1,7 @@
 import csv
 import os
+import re
 from collections import Counter
-from urllib.parse import urlparse
 
 import yaml
 
@@ -16,6 +16,9 @@ URL_COLUMNS_CANDIDATES = [
     "actividad_url_imagen",
 ]
 
+# scheme + netloc en un solo match (más barato que urlparse en el loop del CSV)
+_URL_RE = re.compile(r"^(https?)://([^/?#]+)", re.IGNORECASE)
+
 def normalize_domain(url):
     if not url:
         return None
@@ -26,16 +29,11 @@ def normalize_domain(url):
     if not url.startswith(("http://", "https://")):
         url = "https://" + url
 
-    try:
-        parsed = urlparse(url)
-        host = parsed.netloc.lower().strip()
-        if host.startswith("www."):
-            host = host[4:]
-        if not host:
-            return None
-        return host
-    except Exception:
+    m = _URL_RE.match(url)
+    if not m:
         return None
+    host = m.group(2).lower().strip().removeprefix("www.")
+    return host or None
 
 def detect_delimiter(file_path):
     """Intenta detectar si el CSV usa coma o punto y coma."""
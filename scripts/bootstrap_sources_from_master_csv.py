@@ -1,6 +1,6 @@
 import csv
 import os
-from urllib.parse import urlparse
+import re
 import yaml
 
 INPUT_CSV = "data/raw/convocatorias_2019_2025.csv"
@@ -11,17 +11,17 @@ def detect_delimiter(file_path):
         sample = f.read(4000)
     return ";" if sample.count(";") > sample.count(",") else ","
 
+# captura scheme y host; evita un urlparse completo por fila
+_URL_RE = re.compile(r"^(https?)://([^/?#]+)", re.IGNORECASE)
+
 def base_site(url):
-    try:
-        p = urlparse(url)
-        if not p.scheme or not p.netloc:
-            return ""
-        return f"{p.scheme}://{p.netloc}"
-    except:
+    m = _URL_RE.match(str(url or ""))
+    if not m:
         return ""
+    return f"{m.group(1).lower()}://{m.group(2).lower()}"
 
 def is_http(u):
-    return str(u or "").startswith("http")
+    return str(u or "").startswith(("http://", "https://"))
 
 def main():
     if not os.path.exists(INPUT_CSV):
@@ -30,29 +30,30 @@ def main():
 
     delim = detect_delimiter(INPUT_CSV)
 
-    seeds = {}
+    seeds = {}          # dict como set ordenado
     priority = []
+    seen_prio = set()
 
     with open(INPUT_CSV, "r", encoding="utf-8-sig") as f:
-        reader = csv.DictReader(f, delimiter=delim)
-        print("Columnas detectadas:", reader.fieldnames)
+        reader = csv.reader(f, delimiter=delim)
+        header = next(reader, [])
+        print("Columnas detectadas:", header)
+        idx = [header.index(k) for k in ("fuente_url", "cta_url") if k in header]
 
+        # una sola pasada: cada URL se chequea y se parsea una vez
         for row in reader:
-            fuente = row.get("fuente_url", "")
-            cta = row.get("cta_url", "")
-
-            for u in (fuente, cta):
-                if is_http(u):
+            for i in idx:
+                u = row[i] if i < len(row) else ""
+                if not is_http(u):
+                    continue
+                if u not in seen_prio:
+                    seen_prio.add(u)
                     priority.append(u)
+                b = base_site(u)
+                if b:
+                    seeds[b] = None
 
-            for u in (fuente, cta):
-                if is_http(u):
-                    b = base_site(u)
-                    if b:
-                        seeds[b] = True
-
-    seeds_list = sorted(list(seeds.keys()))
-    priority = list(dict.fromkeys(priority))
+    seeds_list = sorted(seeds)
 
     out = {
         "seeds": seeds_list,
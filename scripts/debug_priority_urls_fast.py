@@ -11,7 +11,8 @@ from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
 from src.parse.html_parser import parse_page
-from src.extract.extractor_ai import TRIGGERS, extract_event_fields
+from src.extract.extractor_ai import _TRIGGER_RE, extract_event_fields
+from src.collect.web_fetch import make_http_cached_session
 
 SOURCES_YML = "config/sources.generated.yml"
 
@@ -20,7 +21,8 @@ TIMEOUT = (5, 10)       # (connect, read) en segundos
 UA = "geochicas-8m-global-mapper/1.0 debug-fast"
 
 def make_session():
-    s = requests.Session()
+    # con requests-cache instalado, las corridas repetidas leen de data/cache/http
+    s = make_http_cached_session() or requests.Session()
     retries = Retry(
         total=1,              # 1 reintento máximo
         backoff_factor=0.3,
@@ -84,7 +86,8 @@ def main():
         parsed = parse_page(url, html)
         blob = ((parsed.get("title") or "") + "\n" + (parsed.get("text") or "")).lower()
 
-        trig = any(t in blob for t in TRIGGERS)
+        # mismo regex que el extractor (una pasada, blob ya en minúsculas)
+        trig = bool(_TRIGGER_RE.search(blob))
         if trig:
             trig_hits += 1
 
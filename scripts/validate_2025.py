@@ -1,35 +1,26 @@
 import sys
 import os
 import csv
-import requests
 
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(PROJECT_ROOT)
 
 from src.parse.html_parser import parse_page
 from src.extract.extractor_ai import extract_event_fields
+from src.collect.web_fetch import make_session, make_http_cached_session, fetch_url
 
 INPUT_CSV = "data/raw/convocatorias_2019_2025.csv"
 MAX_ROWS = 100
 TIMEOUT_SECONDS = 12
 
+# --no-cache fuerza a re-descargar (ignora data/cache/html)
+USE_CACHE = "--no-cache" not in sys.argv[1:]
+
 def detect_delimiter(file_path):
     with open(file_path, "r", encoding="utf-8-sig") as f:
         sample = f.read(4096)
     return ";" if sample.count(";") > sample.count(",") else ","
 
-def fetch(url):
-    try:
-        r = requests.get(
-            url,
-            timeout=TIMEOUT_SECONDS,
-            headers={"User-Agent": "Mozilla/5.0 (8m-global-mapper validate)"}
-        )
-        r.raise_for_status()
-        return r.text
-    except Exception:
-        return None
-
 def norm(s):
     return str(s or "").strip()
 
@@ -81,22 +72,42 @@ def main():
 
     top_fechas = {}
 
-    print(f"\n🔎 Validación (MAX_ROWS={MAX_ROWS}, timeout={TIMEOUT_SECONDS}s)\n")
+    # preferimos requests-cache si está instalado; si no, la caché HTML de fetch_url
+    sess = make_http_cached_session(timeout=TIMEOUT_SECONDS) if USE_CACHE else None
+    use_html_cache = USE_CACHE and sess is None
+    if sess is None:
+        sess = make_session(timeout=TIMEOUT_SECONDS)
+
+    print(f"\n🔎 Validación (MAX_ROWS={MAX_ROWS}, timeout={TIMEOUT_SECONDS}s, cache={USE_CACHE})\n")
 
     with open(INPUT_CSV, encoding="utf-8-sig") as f:
-        reader = csv.DictReader(f, delimiter=delim)
+        reader = csv.reader(f, delimiter=delim)
+        header = next(reader, [])
+
+        # índices resueltos una vez (None si la columna no existe)
+        def col_idx(name):
+            return header.index(name) if name in header else None
+
+        I_FUENTE = col_idx("fuente_url")
+        I_CTA = col_idx("cta_url")
+        I_FECHA = col_idx("actividad_fecha")
+        I_HORA = col_idx("actividad_hora")
+        I_CIUDAD = col_idx("ciudad")
+
+        def cell(row, i):
+            return row[i] if i is not None and i < len(row) else ""
 
         for row in reader:
             total += 1
             if total > MAX_ROWS:
                 break
 
-            url = row.get("fuente_url") or row.get("cta_url")
+            url = cell(row, I_FUENTE) or cell(row, I_CTA)
             if not url:
                 print(f"[{total}] — sin URL")
                 continue
 
-            html = fetch(url)
+            html = fetch_url(sess, url, use_cache=use_html_cache)
             if not html:
                 print(f"[{total}] ⚠️ timeout/error")
                 continue
@@ -112,9 +123,9 @@ def main():
 
             detected += 1
 
-            real_fecha = norm_date(row.get("actividad_fecha"))
-            real_hora = norm_time(row.get("actividad_hora"))
-            real_ciudad = norm(row.get("ciudad"))
+            real_fecha = norm_date(cell(row, I_FECHA))
+            real_hora = norm_time(cell(row, I_HORA))
+            real_ciudad = norm(cell(row, I_CIUDAD))
 
             got_fecha = norm_date(event.get("fecha"))
             got_hora = norm_time(event.get("hora"))
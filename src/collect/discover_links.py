@@ -1,10 +1,12 @@
 # src/collect/discover_links.py
 # Compat con main.py:
-#   from src.collect.discover_links import extract_links, same_domain
+#   from src.collect.discover_links import extract_links_bytes, norm_host
+#   (extract_links / same_domain: variantes sobre str, se mantienen por compat)
 #
 # Responsabilidad:
 # - extraer links de una página (a href) y normalizarlos
 # - decidir si dos URLs son del mismo dominio (netloc)
+#   (norm_host permite precalcular el host del seed en loops calientes)
 
 from __future__ import annotations
 
@@ -15,6 +17,9 @@ from urllib.parse import urljoin, urlparse, urldefrag
 _SKIP_SCHEMES = ("mailto:", "tel:", "javascript:", "data:")
 _RE_HREF = re.compile(r'href\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE)
 
+_SKIP_SCHEMES_B = (b"mailto:", b"tel:", b"javascript:", b"data:")
+_RE_HREF_B = re.compile(rb'href\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE)
+
 
 def _norm_url(u: str) -> str:
     u = (u or "").strip()
@@ -24,18 +29,22 @@ def _norm_url(u: str) -> str:
     return u.strip()
 
 
-def same_domain(seed_url: str, candidate_url: str) -> bool:
+def _strip_www(netloc: str) -> str:
+    # ojo: lstrip("www.") quita *caracteres* (w3.org -> 3.org), no el prefijo
+    return netloc[4:] if netloc.startswith("www.") else netloc
+
+
+def norm_host(url: str) -> str:
+    """netloc en minúsculas y sin 'www.'; "" si la URL no tiene host."""
     try:
-        a = urlparse(seed_url)
-        b = urlparse(candidate_url)
-        if not a.netloc or not b.netloc:
-            return False
-        # normaliza www.
-        an = a.netloc.lower().lstrip("www.")
-        bn = b.netloc.lower().lstrip("www.")
-        return an == bn
+        return _strip_www(urlparse(url).netloc.lower())
     except Exception:
-        return False
+        return ""
+
+
+def same_domain(seed_url: str, candidate_url: str) -> bool:
+    an = norm_host(seed_url)
+    return bool(an) and an == norm_host(candidate_url)
 
 
 def extract_links(base_url: str, html: str) -> list[str]:
@@ -50,31 +59,43 @@ def extract_links(base_url: str, html: str) -> list[str]:
     if not base_url or not html:
         return []
 
-    found: list[str] = []
-
-    # 1) intento simple con regex (rápido, sin deps)
-    for m in _RE_HREF.finditer(html):
-        href = (m.group(1) or "").strip()
-        if not href:
-            continue
-        low = href.lower()
-        if low.startswith(_SKIP_SCHEMES):
-            continue
-        if low.startswith("#"):
-            continue
-
-        abs_u = urljoin(base_url, href)
-        abs_u = _norm_url(abs_u)
-        if abs_u.startswith("http://") or abs_u.startswith("https://"):
-            found.append(abs_u)
-
-    # dedupe preservando orden
-    seen = set()
-    out: list[str] = []
-    for u in found:
-        if u in seen:
-            continue
-        seen.add(u)
-        out.append(u)
-
-    return out
+    def _gen():
+        # intento simple con regex (rápido, sin deps)
+        for m in _RE_HREF.finditer(html):
+            href = (m.group(1) or "").strip()
+            if not href or href.startswith("#"):
+                continue
+            if href.lower().startswith(_SKIP_SCHEMES):
+                continue
+
+            abs_u = _norm_url(urljoin(base_url, href))
+            if abs_u.startswith(("http://", "https://")):
+                yield abs_u
+
+    # dedupe preservando orden, en una sola pasada
+    return list(dict.fromkeys(_gen()))
+
+
+def extract_links_bytes(base_url: str, html: bytes) -> list[str]:
+    """
+    Igual que extract_links pero sobre el HTML en bytes UTF-8 (fetch_url_bytes):
+    evita decodificar la página entera; solo se decodifica cada href encontrado.
+    """
+    base_url = (base_url or "").strip()
+    html = html or b""
+    if not base_url or not html:
+        return []
+
+    def _gen():
+        for m in _RE_HREF_B.finditer(html):
+            href = (m.group(1) or b"").strip()
+            if not href or href.startswith(b"#"):
+                continue
+            if href[:11].lower().startswith(_SKIP_SCHEMES_B):
+                continue
+
+            abs_u = _norm_url(urljoin(base_url, href.decode("utf-8", "replace")))
+            if abs_u.startswith(("http://", "https://")):
+                yield abs_u
+
+    return list(dict.fromkeys(_gen()))
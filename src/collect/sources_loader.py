@@ -12,11 +12,12 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Any, Dict, List, Tuple
 import os
 from urllib.parse import urlparse
 
-import yaml
+from src.collect.web_search import load_yaml
 
 
 SOCIAL_DOMAINS = ("instagram.com", "twitter.com", "x.com", "facebook.com", "fb.me", "t.co")
@@ -44,11 +45,25 @@ def _dedupe(items: list[str]) -> list[str]:
     return out
 
 
+@lru_cache(maxsize=4096)
+def _classify(s: str) -> str:
+    """
+    "url" | "hashtag" | "other". Cacheado: la misma URL aparece en varias
+    secciones/archivos y así se evita re-normalizarla.
+    """
+    sl = s.strip().lower()
+    if sl.startswith(("http://", "https://")):
+        return "url"
+    if sl.startswith("#"):
+        return "hashtag"
+    return "other"
+
+
 def _is_url(s: str) -> bool:
-    s = (s or "").strip().lower()
-    return s.startswith("http://") or s.startswith("https://")
+    return _classify(s or "") == "url"
 
 
+@lru_cache(maxsize=4096)
 def _domain_of(url: str) -> str:
     try:
         return (urlparse(url).netloc or "").lower()
@@ -56,6 +71,7 @@ def _domain_of(url: str) -> str:
         return ""
 
 
+@lru_cache(maxsize=4096)
 def _looks_social(url: str) -> bool:
     u = (url or "").lower()
     return any(d in u for d in SOCIAL_DOMAINS)
@@ -91,9 +107,10 @@ def _collect_from_node(
         s = node.strip()
         if not s:
             return
-        if _is_url(s):
+        kind = _classify(s)
+        if kind == "url":
             seeds.append(s)
-        elif s.startswith("#"):
+        elif kind == "hashtag":
             hashtags.append(s)
         return
 
@@ -217,8 +234,7 @@ def load_sources(path: str) -> SourcesBundle:
     if not os.path.exists(path):
         return SourcesBundle([], [], [], [])
 
-    with open(path, "r", encoding="utf-8") as f:
-        y = yaml.safe_load(f)
+    y = load_yaml(path)
 
     seeds: list[str] = []
     social: list[str] = []
@@ -257,8 +273,7 @@ def load_sources_with_meta(path: str) -> Tuple[List[str], List[str], List[str],
     if not os.path.exists(path):
         return [], [], [], {}, {}
 
-    with open(path, "r", encoding="utf-8") as f:
-        y = yaml.safe_load(f)
+    y = load_yaml(path)
 
     # 1) meta desde estructura seeds/<region>/<tema>/urls
     seeds_meta, hashtags_meta, url_meta, domain_meta = _collect_with_meta_from_seeds_tree(y)
@@ -3,6 +3,8 @@
 # Compat con main.py:
 #   - make_session(timeout=...)
 #   - fetch_url(session, url, use_cache=True) -> str
+#   - fetch_url_bytes(session, url, use_cache=True) -> bytes (UTF-8)
+#   - make_http_cached_session(...) (requests-cache opcional, para scripts)
 
 from __future__ import annotations
 
@@ -15,6 +17,7 @@ import requests
 
 
 CACHE_DIR = "data/cache/html"
+HTTP_CACHE_PATH = "data/cache/http"
 
 DEFAULT_HEADERS = {
     "User-Agent": os.environ.get(
@@ -36,30 +39,64 @@ def make_session(timeout: int = 20) -> requests.Session:
     return s
 
 
+def make_http_cached_session(timeout: int = 20, expire_after: int = 86400):
+    """
+    Session con caché HTTP en SQLite (requests-cache) si está instalado.
+    Devuelve None si requests-cache no está disponible (el caller cae a make_session).
+    stale_if_error: si un sitio se cae, se sigue usando la respuesta vieja.
+    """
+    try:
+        # opcional y solo para scripts: import acá, main.py y los workers no lo pagan
+        import requests_cache
+    except ImportError:
+        return None
+    os.makedirs(os.path.dirname(HTTP_CACHE_PATH), exist_ok=True)
+    s = requests_cache.CachedSession(
+        HTTP_CACHE_PATH,
+        backend="sqlite",
+        expire_after=expire_after,
+        allowable_codes=(200, 301, 302),
+        stale_if_error=True,
+    )
+    s.headers.update(DEFAULT_HEADERS)
+    setattr(s, "request_timeout", int(timeout) if timeout else 20)
+    return s
+
+
 def _cache_path_for_url(url: str) -> str:
-    h = hashlib.sha1(url.encode("utf-8", errors="ignore")).hexdigest()
-    return os.path.join(CACHE_DIR, f"{h}.html")
+    # blake2b (16 bytes) es más rápido que sha1 para strings cortos;
+    # subcarpeta por los 2 primeros hex para no tener un directorio plano enorme
+    h = hashlib.blake2b(url.encode("utf-8", errors="ignore"), digest_size=16).hexdigest()
+    return os.path.join(CACHE_DIR, h[:2], f"{h}.html")
 
 
-def fetch_url(
+def _fetch(
     session: Optional[requests.Session],
     url: str,
-    use_cache: bool = True,
-    timeout: Optional[int] = None,
-) -> str:
+    use_cache: bool,
+    timeout: Optional[int],
+    raw: bool,
+):
     """
-    Descarga HTML. Si use_cache=True, lee/escribe en data/cache/html.
-    Devuelve "" si falla (para que el pipeline siga).
+    Núcleo compartido por fetch_url / fetch_url_bytes.
+    La caché en disco siempre guarda el HTML decodificado en UTF-8; con raw=True
+    un hit de caché se devuelve tal cual (sin decodificar la página entera) y un
+    miss se re-codifica a UTF-8: los bytes son UTF-8 en los dos caminos, sea cual
+    sea el charset de la página (extract_links_bytes decodifica los href así).
     """
+    empty = b"" if raw else ""
+
     url = (url or "").strip()
     if not url:
-        return ""
+        return empty
 
-    os.makedirs(CACHE_DIR, exist_ok=True)
     cache_path = _cache_path_for_url(url)
 
     if use_cache and os.path.exists(cache_path) and os.path.getsize(cache_path) > 0:
         try:
+            if raw:
+                with open(cache_path, "rb") as f:
+                    return f.read()
             with open(cache_path, "r", encoding="utf-8", errors="ignore") as f:
                 return f.read()
         except Exception:
@@ -83,16 +120,43 @@ def fetch_url(
         r.raise_for_status()
         html = r.text or ""
     except Exception:
-        return ""
+        return empty
 
     if use_cache and html:
         try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
             with open(cache_path, "w", encoding="utf-8") as f:
                 f.write(html)
         except Exception:
             pass
 
-    return html
+    return html.encode("utf-8") if raw else html
+
+
+def fetch_url(
+    session: Optional[requests.Session],
+    url: str,
+    use_cache: bool = True,
+    timeout: Optional[int] = None,
+) -> str:
+    """
+    Descarga HTML. Si use_cache=True, lee/escribe en data/cache/html.
+    Devuelve "" si falla (para que el pipeline siga).
+    """
+    return _fetch(session, url, use_cache, timeout, raw=False)
+
+
+def fetch_url_bytes(
+    session: Optional[requests.Session],
+    url: str,
+    use_cache: bool = True,
+    timeout: Optional[int] = None,
+) -> bytes:
+    """
+    Igual que fetch_url pero devuelve el HTML en bytes UTF-8 (para extract_links_bytes).
+    Devuelve b"" si falla.
+    """
+    return _fetch(session, url, use_cache, timeout, raw=True)
 
 
 # Backwards compat (por si algo viejo aún llama fetch_page)
@@ -1,9 +1,28 @@
 # src/collect/web_search.py
+import os
+from itertools import chain
+
 import yaml
 
+# libyaml (C) si está disponible; si no, el SafeLoader puro Python
+_Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# path -> (mtime, parsed): la config no cambia durante una corrida
+_YAML_CACHE = {}
+
 def load_yaml(path):
+    """
+    Parsea un YAML con caché por (path, mtime).
+    Ojo: devuelve el mismo objeto en cada hit, los callers no deben mutarlo.
+    """
+    mtime = os.path.getmtime(path)
+    hit = _YAML_CACHE.get(path)
+    if hit is not None and hit[0] == mtime:
+        return hit[1]
     with open(path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+        y = yaml.load(f, Loader=_Loader)
+    _YAML_CACHE[path] = (mtime, y)
+    return y
 
 def load_sources_and_keywords(
     sources_config_path="config/sources.yml",
@@ -12,26 +31,19 @@ def load_sources_and_keywords(
     sources_cfg = load_yaml(sources_config_path)
     keywords_cfg = load_yaml(keywords_config_path)
 
-    seed_urls = []
-    for src in sources_cfg.get("sources", []):
-        url = (src.get("url") or "").strip()
-        if url:
-            seed_urls.append(url)
-
-    # Flatten keywords (idiomas + términos)
-    keywords = []
-    for _, kws in keywords_cfg.get("languages", {}).items():
-        keywords.extend(kws or [])
-    keywords.extend(keywords_cfg.get("event_terms", []) or [])
-
-    # dedupe conservando orden
-    def unique_keep_order(items):
-        seen = set()
-        out = []
-        for i in items:
-            if i not in seen:
-                seen.add(i)
-                out.append(i)
-        return out
-
-    return unique_keep_order(seed_urls), unique_keep_order(keywords)
+    # URLs y keywords (idiomas + términos) aplanadas y deduplicadas en una pasada,
+    # conservando orden
+    seed_urls = list(dict.fromkeys(
+        url
+        for url in ((src.get("url") or "").strip() for src in sources_cfg.get("sources", []))
+        if url
+    ))
+
+    kws_iter = chain.from_iterable(
+        (kws or []) for kws in keywords_cfg.get("languages", {}).values()
+    )
+    keywords = list(dict.fromkeys(
+        chain(kws_iter, keywords_cfg.get("event_terms", []) or [])
+    ))
+
+    return seed_urls, keywords
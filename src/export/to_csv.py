@@ -3,23 +3,32 @@ from __future__ import annotations
 
 import csv
 import os
-from typing import Iterable, List, Dict, Optional
+from typing import Iterable, Iterator, List, Dict, Optional
+
+
+_WRITE_BUFFER = 1 << 20
+
+
+# dirs ya creados en esta corrida (los 3 exports van al mismo directorio)
+_ENSURED_DIRS: set[str] = set()
 
 
 def _ensure_parent_dir(path: str) -> None:
     d = os.path.dirname(path)
-    if d:
-        os.makedirs(d, exist_ok=True)
+    if not d or d in _ENSURED_DIRS:
+        return
+    os.makedirs(d, exist_ok=True)
+    _ENSURED_DIRS.add(d)
 
 
-def _normalize_rows(rows: Optional[Iterable[dict]]) -> List[Dict]:
-    if not rows:
-        return []
-    out: List[Dict] = []
-    for r in rows:
+def _iter_normalized(rows: Optional[Iterable[dict]]) -> Iterator[Dict]:
+    for r in rows or ():
         if isinstance(r, dict):
-            out.append(r)
-    return out
+            yield r
+
+
+def _normalize_rows(rows: Optional[Iterable[dict]]) -> List[Dict]:
+    return list(_iter_normalized(rows))
 
 
 def _infer_columns(rows: List[Dict]) -> List[str]:
@@ -30,20 +39,26 @@ def _infer_columns(rows: List[Dict]) -> List[str]:
 
 
 def export_csv(path: str, rows: Iterable[dict], columns: Optional[List[str]] = None) -> str:
-    rows_n = _normalize_rows(rows)
+    """
+    Escribe rows en streaming: con columnas explícitas no se materializa la lista
+    (rows puede ser un generador). Solo se recorre todo antes si hay que inferir columnas.
+    """
     cols = [c for c in (columns or []) if isinstance(c, str) and c.strip()]
-    if not cols:
+    if cols:
+        rows_n: Iterable[dict] = _iter_normalized(rows)
+    else:
+        rows_n = _normalize_rows(rows)
         cols = _infer_columns(rows_n)
 
     _ensure_parent_dir(path)
 
-    with open(path, "w", encoding="utf-8", newline="") as f:
-        w = csv.DictWriter(f, fieldnames=cols, extrasaction="ignore")
-        w.writeheader()
-        for r in rows_n:
-            for c in cols:
-                r.setdefault(c, "")
-            w.writerow(r)
+    # buffer de 1 MiB: menos syscalls de escritura en exports grandes
+    with open(path, "w", encoding="utf-8", newline="", buffering=_WRITE_BUFFER) as f:
+        # csv.writer + lista por fila: evita la capa de mapeo de DictWriter;
+        # columnas faltantes -> "" sin mutar los dicts de entrada
+        w = csv.writer(f)
+        w.writerow(cols)
+        w.writerows([r.get(c, "") for c in cols] for r in rows_n)
 
     return path
 
@@ -115,35 +130,30 @@ SIN_COORD_COLUMNS = [
 
 
 def _score_ok(r: dict, min_score: int) -> bool:
+    # min_score ya viene como int (se castea una vez en cada export_*)
     try:
-        return int(r.get("score_relevancia") or 0) >= int(min_score)
-    except Exception:
+        return int(r.get("score_relevancia") or 0) >= min_score
+    except (TypeError, ValueError):
         return False
 
 
-def export_master_csv(path: str, rows: List[dict]) -> str:
+def export_master_csv(path: str, rows: Iterable[dict]) -> str:
     return export_csv(path, rows, MASTER_COLUMNS)
 
 
-def export_umap_csv(path: str, rows: List[dict], min_score: int = 10) -> str:
-    rows_n = _normalize_rows(rows)
-    filtered = []
-    for r in rows_n:
-        if not _score_ok(r, min_score):
-            continue
-        if not (r.get("lat") and r.get("lon")):
-            continue
-        filtered.append(r)
+def export_umap_csv(path: str, rows: Iterable[dict], min_score: int = 10) -> str:
+    min_score = int(min_score)
+    filtered = (
+        r for r in _iter_normalized(rows)
+        if _score_ok(r, min_score) and r.get("lat") and r.get("lon")
+    )
     return export_csv(path, filtered, UMAP_COLUMNS)
 
 
-def export_sin_coord_csv(path: str, rows: List[dict], min_score: int = 10) -> str:
-    rows_n = _normalize_rows(rows)
-    filtered = []
-    for r in rows_n:
-        if not _score_ok(r, min_score):
-            continue
-        if r.get("lat") and r.get("lon"):
-            continue
-        filtered.append(r)
+def export_sin_coord_csv(path: str, rows: Iterable[dict], min_score: int = 10) -> str:
+    min_score = int(min_score)
+    filtered = (
+        r for r in _iter_normalized(rows)
+        if _score_ok(r, min_score) and not (r.get("lat") and r.get("lon"))
+    )
     return export_csv(path, filtered, SIN_COORD_COLUMNS)
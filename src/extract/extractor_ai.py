@@ -38,6 +38,33 @@ _EVENT_TERMS = [
     "kundgebung", "streik",
 ]
 
+def _trie_pattern(words):
+    """
+    Alternancia factorizada por prefijos comunes ("8m|8 m|8marzo" ->
+    "8(?: m|m(?:arzo)?)"): menos ramas iniciales para el motor de regex.
+    Equivalente a "|".join(words) para search().
+    """
+    trie = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node):
+        alts = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+# alternancia única sobre TRIGGERS: un solo scan en C para saber si hay alguno
+_TRIGGER_RE = re.compile(_trie_pattern(TRIGGERS))
+_EVENT_TERMS_RE = re.compile(_trie_pattern(_EVENT_TERMS))
+
 _RE_DATE_ISO   = re.compile(r"\b(20\d{2})-(0[1-9]|1[0-2])-(0[1-9]|[12]\d|3[01])\b")
 _RE_DATE_SLASH = re.compile(r"\b(0?[1-9]|[12]\d|3[01])/(0[1-9]|1[0-2])/(20\d{2})\b")
 _RE_DATE_DASH  = re.compile(r"\b(0?[1-9]|[12]\d|3[01])-(0[1-9]|1[0-2])-(20\d{2})\b")
@@ -59,10 +86,8 @@ _MONTH_ES = {
 
 
 def _normalize_text(s):
-    s = s or ""
-    s = s.replace("\u00a0", " ")
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
+    # colapsa whitespace (incluye \u00a0) en C, sin pasar por el motor de regex
+    return " ".join((s or "").split())
 
 
 def _extract_date(text):
@@ -71,46 +96,64 @@ def _extract_date(text):
         return f"{m.group(1)}-{m.group(2)}-{m.group(3)}"
     m = _RE_DATE_SLASH.search(text)
     if m:
-        return f"{m.group(3)}-{m.group(2)}-{int(m.group(1)):02d}"
+        return f"{m.group(3)}-{m.group(2)}-{m.group(1).zfill(2)}"
     m = _RE_DATE_DASH.search(text)
     if m:
-        return f"{m.group(3)}-{m.group(2)}-{int(m.group(1)):02d}"
+        return f"{m.group(3)}-{m.group(2)}-{m.group(1).zfill(2)}"
     m = _RE_DATE_ES.search(text)
     if m:
-        day   = int(m.group(1))
+        day   = m.group(1).zfill(2)
         month = _MONTH_ES.get(m.group(2).lower(), "03")
         year  = m.group(3) or "2025"
-        return f"{year}-{month}-{day:02d}"
+        return f"{year}-{month}-{day}"
     return ""
 
 
 def _extract_time(text):
     m = _RE_TIME.search(text)
     if m:
-        return f"{int(m.group(1)):02d}:{m.group(2)}"
+        # los grupos son 1-2 dígitos: zfill evita el int() + format
+        return f"{m.group(1).zfill(2)}:{m.group(2)}"
     return ""
 
 
-def _basic_score(text):
+def _basic_score(text, has_date, has_time):
+    # has_date / has_time: lo que el caller ya extrajo (evita re-escanear el texto)
     t = (text or "").lower()
     score = 0
 
-    trigger_hits = sum(1 for trig in TRIGGERS if trig in t)
+    # la mayoría de las páginas no tiene ningún trigger: evita los N scans
+    trigger_hits = 0
+    if _TRIGGER_RE.search(t):
+        trigger_hits = sum(1 for trig in TRIGGERS if trig in t)
     score += min(trigger_hits * 3, 9)
 
-    if (_RE_DATE_ISO.search(text) or _RE_DATE_SLASH.search(text) or
-            _RE_DATE_DASH.search(text) or _RE_DATE_ES.search(text)):
+    if has_date:
         score += 2
-    if _RE_TIME.search(text):
+    if has_time:
         score += 2
 
-    term_hits = sum(1 for term in _EVENT_TERMS if term in t)
-    score += min(term_hits, 4)
+    # mismo esquema: un scan para descartar, y el conteo corta al llegar al tope (4)
+    term_hits = 0
+    if _EVENT_TERMS_RE.search(t):
+        for term in _EVENT_TERMS:
+            if term in t:
+                term_hits += 1
+                if term_hits == 4:
+                    break
+    score += term_hits
 
     return min(score, 20)
 
 
-def extract_event_fields(parsed):
+def _min_score():
+    return int(os.environ.get("EXTRACTOR_MIN_SCORE", "1"))
+
+
+def extract_event_fields(parsed, min_score=None):
+    # min_score: el batch lo resuelve una vez por lote en vez de leer el env por doc
+    if min_score is None:
+        min_score = _min_score()
     if not isinstance(parsed, dict):
         return None
 
@@ -122,15 +165,15 @@ def extract_event_fields(parsed):
     if not blob:
         return None
 
-    score = _basic_score(blob)
+    # fecha/hora una sola vez: el score reutiliza el resultado en vez de re-escanear
+    fecha  = _extract_date(blob)
+    hora   = _extract_time(blob)
+
+    score = _basic_score(blob, has_date=bool(fecha), has_time=bool(hora))
 
-    min_score = int(os.environ.get("EXTRACTOR_MIN_SCORE", "1"))
     if score < min_score:
         return None
 
-    fecha  = _extract_date(blob)
-    hora   = _extract_time(blob)
-
     imagen = (parsed.get("og_image") or "").strip()
     if not imagen:
         imgs   = parsed.get("images") or []
@@ -158,3 +201,12 @@ def extract_event_fields(parsed):
         "score_relevancia":     score,
     }
     return ev
+
+
+def extract_event_fields_batch(parsed_docs):
+    """
+    Versión batch de extract_event_fields: un ev (o None) por doc, mismo orden.
+    El umbral (EXTRACTOR_MIN_SCORE) se lee y parsea una sola vez por lote.
+    """
+    min_score = _min_score()
+    return [extract_event_fields(p, min_score) for p in parsed_docs]
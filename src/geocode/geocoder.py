@@ -1,17 +1,26 @@
 # src/geocode/geocoder.py
 from __future__ import annotations
 
+import atexit
 import os
-import re
 import sqlite3
 import time
 from dataclasses import dataclass
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 import requests
 
 DEFAULT_DB_PATH = "data/processed/geocode_cache.sqlite"
 NOMINATIM_URL   = "https://nominatim.openstreetmap.org/search"
+# filas nuevas que se juntan antes de escribirlas en una sola transacción
+CACHE_FLUSH_EVERY = 100
+# espera ante un 429 sin Retry-After numérico, y tope para un Retry-After exagerado
+RETRY_AFTER_DEFAULT = 5.0
+RETRY_AFTER_MAX     = 60.0
+# cuánto se recuerda una query sin resultados antes de volver a intentarla
+NEGATIVE_TTL_SECONDS = 7 * 86400
+# parámetros por SELECT ... IN (SQLite viejo limita a 999)
+SQL_IN_BATCH = 900
 
 # Mapeo nombre de país → código ISO2 para restringir búsquedas en Nominatim.
 # Evita que "Santiago de Chile" geocodifique un evento boliviano en Chile.
@@ -68,6 +77,10 @@ class GeocodeResult:
     precision:    str
 
 
+# resultado negativo cacheado (la query no dio resultados en Nominatim)
+_MISS = GeocodeResult("", "", "", "", "")
+
+
 class Geocoder:
 
     def __init__(
@@ -82,6 +95,14 @@ class Geocoder:
         self.min_delay_seconds = min_delay_seconds
         self.timeout_seconds   = timeout_seconds
         self._last_call_ts     = 0.0
+        # query -> fila aún no escrita en SQLite (ver _flush_cache)
+        self._pending: Dict[str, tuple] = {}
+        # hits ya leídos de SQLite: una query repetida no vuelve a la base
+        self._mem: Dict[str, GeocodeResult] = {}
+
+        # una sola Session: keep-alive con Nominatim en vez de un handshake TLS por query
+        self._session = requests.Session()
+        self._session.headers["User-Agent"] = user_agent
 
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
         self.conn = sqlite3.connect(db_path)
@@ -89,6 +110,11 @@ class Geocoder:
 
     def _init_db(self):
         cur = self.conn.cursor()
+        # WAL + synchronous=NORMAL: un commit por fila ya no fuerza fsync del journal
+        cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute("PRAGMA synchronous=NORMAL")
+        cur.execute("PRAGMA busy_timeout=5000")
+        cur.execute("PRAGMA temp_store=MEMORY")
         cur.execute("""
             CREATE TABLE IF NOT EXISTS geocode_cache (
                 query        TEXT PRIMARY KEY,
@@ -96,38 +122,105 @@ class Geocoder:
                 lon          TEXT,
                 display_name TEXT,
                 confidence   TEXT,
-                precision    TEXT
+                precision    TEXT,
+                miss_ts      INTEGER
             )
         """)
+        # cachés creadas antes de guardar misses: agregar la columna
+        cols = {r[1] for r in cur.execute("PRAGMA table_info(geocode_cache)")}
+        if "miss_ts" not in cols:
+            cur.execute("ALTER TABLE geocode_cache ADD COLUMN miss_ts INTEGER")
         self.conn.commit()
+        # set exacto de queries cacheadas (la tabla es chica): un miss no toca SQLite
+        self._keys = {q for (q,) in cur.execute("SELECT query FROM geocode_cache")}
 
     def close(self):
         try:
+            self._flush_cache()
+            self._session.close()
+            # vuelca el WAL al .sqlite para no dejar el -wal grande entre corridas
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
             self.conn.close()
         except Exception:
             pass
 
     def _norm_query(self, q: str) -> str:
-        return re.sub(r"\s+", " ", (q or "").strip()).lower()
+        return " ".join((q or "").split()).lower()
+
+    def _cache_key(self, query: str, countrycodes: Optional[str]) -> str:
+        return self._norm_query(
+            f"{query}|cc={countrycodes}" if countrycodes else query
+        )
+
+    def _preload(self, keys) -> None:
+        """Trae de SQLite, en lotes de un SELECT ... IN, las keys cacheadas que aún no están en memoria."""
+        todo = [k for k in keys if k in self._keys and k not in self._mem]
+        for i in range(0, len(todo), SQL_IN_BATCH):
+            batch = todo[i:i + SQL_IN_BATCH]
+            rows = self.conn.execute(
+                "SELECT query, lat, lon, display_name, confidence, precision, miss_ts "
+                f"FROM geocode_cache WHERE query IN ({','.join('?' * len(batch))})",
+                batch,
+            ).fetchall()
+            for row in rows:
+                hit = self._row_to_result(row[1:])
+                if hit is not None:
+                    self._mem[row[0]] = hit
+
+    def _row_to_result(self, row: tuple) -> Optional[GeocodeResult]:
+        # row = (lat, lon, display_name, confidence, precision, miss_ts)
+        miss_ts = row[5]
+        if miss_ts is None:
+            return GeocodeResult(*row[:5])
+        # miss vencido: None para que geocode vuelva a preguntar
+        return _MISS if time.time() - miss_ts < NEGATIVE_TTL_SECONDS else None
 
     def _get_cached(self, q_norm: str) -> Optional[GeocodeResult]:
-        cur = self.conn.cursor()
-        cur.execute(
-            "SELECT lat, lon, display_name, confidence, precision "
+        """Hit, _MISS (sin resultado reciente en Nominatim) o None (no cacheado)."""
+        hit = self._mem.get(q_norm)
+        if hit is not None:
+            return hit
+        row = self._pending.get(q_norm)
+        if row is not None:
+            return self._row_to_result(row[1:])
+        if q_norm not in self._keys:
+            return None
+        # conn.execute: sin cursor intermedio; sqlite3 reusa el statement de su caché
+        row = self.conn.execute(
+            "SELECT lat, lon, display_name, confidence, precision, miss_ts "
             "FROM geocode_cache WHERE query = ?",
             (q_norm,),
+        ).fetchone()
+        if not row:
+            return None
+        hit = self._row_to_result(row)
+        if hit is not None:
+            self._mem[q_norm] = hit
+        return hit
+
+    def _set_cache(self, q_norm: str, res: GeocodeResult, miss_ts: Optional[int] = None):
+        self._pending[q_norm] = (
+            q_norm, res.lat, res.lon, res.display_name, res.confidence, res.precision, miss_ts
         )
-        row = cur.fetchone()
-        return GeocodeResult(*row) if row else None
-
-    def _set_cache(self, q_norm: str, res: GeocodeResult):
-        cur = self.conn.cursor()
-        cur.execute("""
-            INSERT OR REPLACE INTO geocode_cache
-              (query, lat, lon, display_name, confidence, precision)
-            VALUES (?,?,?,?,?,?)
-        """, (q_norm, res.lat, res.lon, res.display_name, res.confidence, res.precision))
-        self.conn.commit()
+        if len(self._pending) >= CACHE_FLUSH_EVERY:
+            self._flush_cache()
+
+    def _set_miss(self, q_norm: str):
+        # Nominatim respondió sin resultados: no volver a preguntar por NEGATIVE_TTL_SECONDS
+        self._set_cache(q_norm, _MISS, miss_ts=int(time.time()))
+
+    def _flush_cache(self):
+        """Escribe las filas pendientes con un executemany en una sola transacción."""
+        if not self._pending:
+            return
+        with self.conn:
+            self.conn.executemany("""
+                INSERT OR REPLACE INTO geocode_cache
+                  (query, lat, lon, display_name, confidence, precision, miss_ts)
+                VALUES (?,?,?,?,?,?,?)
+            """, list(self._pending.values()))
+        self._keys.update(self._pending)
+        self._pending.clear()
 
     def _rate_limit(self):
         now     = time.time()
@@ -136,6 +229,27 @@ class Geocoder:
             time.sleep(self.min_delay_seconds - elapsed)
         self._last_call_ts = time.time()
 
+    def _retry_after(self, r) -> float:
+        try:
+            wait = float(r.headers.get("Retry-After", ""))
+        except ValueError:
+            wait = RETRY_AFTER_DEFAULT
+        return min(max(wait, self.min_delay_seconds), RETRY_AFTER_MAX)
+
+    def _search(self, params: Dict[str, Any]) -> Any:
+        """
+        Un request a Nominatim (respetando el rate limit); lanza si falla.
+        Ante un 429 espera lo que pide Retry-After y reintenta una sola vez.
+        """
+        for attempt in range(2):
+            self._rate_limit()
+            r = self._session.get(NOMINATIM_URL, params=params, timeout=self.timeout_seconds)
+            if r.status_code == 429 and attempt == 0:
+                time.sleep(self._retry_after(r))
+                continue
+            r.raise_for_status()
+            return r.json()
+
     def geocode(
         self,
         query:        str,
@@ -148,16 +262,14 @@ class Geocoder:
         Si se pasa y no hay resultados, reintenta sin la restricción.
         La clave de caché incluye el countrycode para no mezclar resultados.
         """
-        cache_key = self._norm_query(
-            f"{query}|cc={countrycodes}" if countrycodes else query
-        )
+        cache_key = self._cache_key(query, countrycodes)
 
         cached = self._get_cached(cache_key)
+        if cached is _MISS:
+            return None
         if cached:
             return cached
 
-        self._rate_limit()
-
         params: Dict[str, Any] = {
             "q":      query,
             "format": "jsonv2",
@@ -167,34 +279,20 @@ class Geocoder:
             params["countrycodes"] = countrycodes
 
         try:
-            r = requests.get(
-                NOMINATIM_URL,
-                params=params,
-                timeout=self.timeout_seconds,
-                headers={"User-Agent": self.user_agent},
-            )
-            r.raise_for_status()
-            data = r.json()
+            data = self._search(params)
         except Exception:
             return None
 
         # Si con countrycode no hay resultados, reintentar sin él
         if not data and countrycodes:
-            self._rate_limit()
             try:
                 params_fb = {k: v for k, v in params.items() if k != "countrycodes"}
-                r2 = requests.get(
-                    NOMINATIM_URL,
-                    params=params_fb,
-                    timeout=self.timeout_seconds,
-                    headers={"User-Agent": self.user_agent},
-                )
-                r2.raise_for_status()
-                data = r2.json()
+                data = self._search(params_fb)
             except Exception:
                 return None
 
         if not data:
+            self._set_miss(cache_key)
             return None
 
         hit = data[0]
@@ -221,6 +319,8 @@ def _get_geocoder() -> Geocoder:
     global _GEOCODER
     if _GEOCODER is None:
         _GEOCODER = Geocoder()
+        # las escrituras se juntan en _pending: que no se pierdan al salir
+        atexit.register(_GEOCODER.close)
     return _GEOCODER
 
 
@@ -230,23 +330,13 @@ def load_geocode_cache(path: str) -> Dict[str, Any]:
 
 
 def save_geocode_cache(path: str, cache: Dict[str, Any]) -> None:
-    """Stub de compatibilidad."""
-    return None
+    """Compat: la caché vive en SQLite; acá solo se vuelcan las filas pendientes."""
+    if _GEOCODER is not None:
+        _GEOCODER._flush_cache()
 
 
-def geocode_event(
-    ev: Dict[str, Any],
-    geocode_cache=None,
-) -> Optional[Dict[str, str]]:
-    """
-    Geocodifica un evento a partir de sus campos ciudad/pais.
-
-    Cambios respecto a la versión anterior:
-    - Valida que lat/lon sean números reales antes de devolverlos sin geocodificar.
-    - Pasa countrycodes a Nominatim cuando el país está disponible.
-    - Si la búsqueda restringida no da resultados, reintenta sin restricción.
-    """
-    # Si ya tiene coordenadas válidas, no llamar a Nominatim
+def _coords_from_event(ev: Dict[str, Any]) -> Optional[Dict[str, str]]:
+    """Si el evento ya trae lat/lon válidos, el resultado sin pasar por Nominatim."""
     try:
         lat = float(ev.get("lat") or "")
         lon = float(ev.get("lon") or "")
@@ -260,7 +350,11 @@ def geocode_event(
             }
     except (TypeError, ValueError):
         pass
+    return None
+
 
+def _event_query(ev: Dict[str, Any]) -> Optional[tuple]:
+    """(query, countrycodes) a partir de ciudad/pais, o None si no hay con qué."""
     ciudad = (ev.get("ciudad") or "").strip()
     pais   = (ev.get("pais")   or "").strip()
 
@@ -269,12 +363,12 @@ def geocode_event(
 
     query        = ", ".join(x for x in [ciudad, pais] if x)
     countrycodes = _country_to_iso2(pais) if pais else None
+    return query, countrycodes
 
-    g   = _get_geocoder()
-    res = g.geocode(query, countrycodes=countrycodes)
+
+def _result_dict(res: Optional[GeocodeResult]) -> Optional[Dict[str, str]]:
     if not res:
         return None
-
     return {
         "lat":          res.lat,
         "lon":          res.lon,
@@ -282,3 +376,46 @@ def geocode_event(
         "confidence":   res.confidence,
         "precision":    res.precision,
     }
+
+
+def geocode_event(
+    ev: Dict[str, Any],
+    geocode_cache=None,
+) -> Optional[Dict[str, str]]:
+    """
+    Geocodifica un evento a partir de sus campos ciudad/pais.
+
+    Cambios respecto a la versión anterior:
+    - Valida que lat/lon sean números reales antes de devolverlos sin geocodificar.
+    - Pasa countrycodes a Nominatim cuando el país está disponible.
+    - Si la búsqueda restringida no da resultados, reintenta sin restricción.
+    """
+    # Si ya tiene coordenadas válidas, no llamar a Nominatim
+    coords = _coords_from_event(ev)
+    if coords:
+        return coords
+
+    q = _event_query(ev)
+    if q is None:
+        return None
+
+    return _result_dict(_get_geocoder().geocode(q[0], countrycodes=q[1]))
+
+
+def geocode_events(evs: List[Dict[str, Any]]) -> List[Optional[Dict[str, str]]]:
+    """
+    Versión bulk de geocode_event: un resultado (o None) por evento, mismo orden.
+    Deduplica las queries "ciudad, pais", trae las cacheadas de SQLite con pocos
+    SELECT ... IN, consulta Nominatim solo una vez por query nueva y escribe
+    la caché en una sola transacción al final.
+    """
+    coords  = [_coords_from_event(ev) for ev in evs]
+    queries = [None if c else _event_query(ev) for ev, c in zip(evs, coords)]
+    unique  = list(dict.fromkeys(q for q in queries if q is not None))
+
+    g = _get_geocoder()
+    g._preload([g._cache_key(query, cc) for query, cc in unique])
+    by_query = {q: _result_dict(g.geocode(q[0], countrycodes=q[1])) for q in unique}
+    g._flush_cache()
+
+    return [c or (by_query[q] if q is not None else None) for c, q in zip(coords, queries)]
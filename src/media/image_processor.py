@@ -3,6 +3,10 @@ from __future__ import annotations
 
 import hashlib
 import os
+import re
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
 
 import requests
@@ -21,37 +25,89 @@ def _safe_join_url(*parts: str) -> str:
     return "/".join(cleaned)
 
 
+# extensión aceptada al final del path (un search en vez de splitext + lower + in)
+_RE_IMG_EXT = re.compile(r"\.(jpe?g|png|webp)$", re.IGNORECASE)
+
+
 def _ext_from_url(url: str) -> str:
     try:
-        path = urlparse(url).path or ""
-        _, ext = os.path.splitext(path)
-        ext = (ext or "").lower()
-        if ext in (".jpg", ".jpeg", ".png", ".webp"):
-            return ext
+        m = _RE_IMG_EXT.search(urlparse(url).path or "")
+        if m:
+            return "." + m.group(1).lower()
     except Exception:
         pass
     return ".jpg"
 
 
+_SESSION: requests.Session | None = None
+_SESSION_LOCK = threading.Lock()
+
+# tope por imagen: más que esto no es un afiche/flyer, se descarta sin bajarlo entero
+MAX_IMAGE_BYTES = 15 * 1024 * 1024
+
+# descargas simultáneas como máximo por host (no martillar un mismo CDN)
+MAX_PER_HOST = 4
+_HOST_SLOTS: defaultdict[str, threading.Semaphore] = defaultdict(
+    lambda: threading.Semaphore(MAX_PER_HOST)
+)
+_HOST_SLOTS_LOCK = threading.Lock()
+
+
+def _get_session() -> requests.Session:
+    # Session compartida: reusa conexiones con los CDNs (keep-alive) entre imágenes
+    # (se crea bajo lock: download_images_batch la pide desde varios threads a la vez)
+    global _SESSION
+    if _SESSION is None:
+        with _SESSION_LOCK:
+            if _SESSION is None:
+                s = requests.Session()
+                s.headers["User-Agent"] = os.environ.get(
+                    "USER_AGENT",
+                    "geochicas-8m-global-mapper/1.0 (+https://github.com/geochicas/8m-global-mapper)",
+                )
+                _SESSION = s
+    return _SESSION
+
+
 def _download_bytes(url: str, timeout: int) -> bytes | None:
     """
     Descarga bytes de imagen con requests (sin depender de web_fetch.fetch_url),
     para evitar incompatibilidades de firma.
     """
-    headers = {
-        "User-Agent": os.environ.get(
-            "USER_AGENT",
-            "geochicas-8m-global-mapper/1.0 (+https://github.com/geochicas/8m-global-mapper)",
-        )
-    }
     try:
-        r = requests.get(url, headers=headers, timeout=timeout)
-        r.raise_for_status()
-        return r.content
+        # stream=True: se miran los headers antes de bajar el body
+        with _get_session().get(url, timeout=timeout, stream=True) as r:
+            r.raise_for_status()
+            ct = (r.headers.get("Content-Type") or "").lower()
+            if ct.startswith("text/") or "html" in ct:
+                # página de error / login en vez de imagen: no vale la pena bajarla
+                return None
+            if int(r.headers.get("Content-Length") or 0) > MAX_IMAGE_BYTES:
+                return None
+            # chunks a una lista y un solo join; corta apenas se pasa del tope
+            parts = []
+            total = 0
+            for chunk in r.iter_content(chunk_size=65536):
+                total += len(chunk)
+                if total > MAX_IMAGE_BYTES:
+                    return None
+                parts.append(chunk)
+            return b"".join(parts)
     except Exception:
         return None
 
 
+# dirs ya creados en esta corrida (todas las imágenes van al mismo out_dir)
+_ENSURED_DIRS: set[str] = set()
+
+
+def _ensure_dir(d: str) -> None:
+    if d in _ENSURED_DIRS:
+        return
+    os.makedirs(d, exist_ok=True)
+    _ENSURED_DIRS.add(d)
+
+
 def download_and_process_image(source_url: str, out_dir: str = "data/images") -> dict:
     """
     Descarga imagen y devuelve:
@@ -67,25 +123,55 @@ def download_and_process_image(source_url: str, out_dir: str = "data/images") ->
     if not source_url.startswith("http"):
         return {"public_url": "", "local_path": "", "source_url": source_url}
 
-    os.makedirs(out_dir, exist_ok=True)
+    _ensure_dir(out_dir)
 
     ext = _ext_from_url(source_url)
     h = hashlib.sha1(source_url.encode("utf-8")).hexdigest()
     fname = f"{h}{ext}"
     local_path = os.path.join(out_dir, fname)
 
-    if not os.path.exists(local_path):
+    # un solo stat: después solo cambia si la escribimos acá
+    exists = os.path.exists(local_path)
+    if not exists:
         timeout = int(os.environ.get("REQUEST_TIMEOUT", "20"))
         content = _download_bytes(source_url, timeout=timeout)
         if content:
             with open(local_path, "wb") as f:
                 f.write(content)
+            exists = True
 
     # public_url para Pages: site/images/... se publica como /images/...
     public_url = _safe_join_url("images", fname)
 
     return {
-        "public_url": public_url if os.path.exists(local_path) else "",
-        "local_path": local_path if os.path.exists(local_path) else "",
+        "public_url": public_url if exists else "",
+        "local_path": local_path if exists else "",
         "source_url": source_url,
     }
+
+
+def _download_one_limited(source_url: str, out_dir: str) -> dict:
+    host = urlparse(source_url).netloc.lower()
+    with _HOST_SLOTS_LOCK:
+        slot = _HOST_SLOTS[host]
+    with slot:
+        return download_and_process_image(source_url, out_dir=out_dir)
+
+
+def download_images_batch(
+    urls: list[str],
+    out_dir: str = "data/images",
+    max_workers: int = 8,
+) -> list[dict]:
+    """
+    Descarga varias imágenes en paralelo (son I/O puro) con un ThreadPoolExecutor.
+    Devuelve un dict por URL, en el mismo orden; URLs repetidas se bajan una vez.
+    """
+    unique = list(dict.fromkeys(urls))
+    if max_workers <= 1 or len(unique) <= 1:
+        by_url = {u: download_and_process_image(u, out_dir=out_dir) for u in unique}
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            outs = pool.map(lambda u: _download_one_limited(u, out_dir), unique)
+            by_url = dict(zip(unique, outs))
+    return [by_url[u] for u in urls]
@@ -2,10 +2,17 @@
 from __future__ import annotations
 
 import re
+from html import unescape
 from html.parser import HTMLParser
 from typing import Any
 from urllib.parse import urljoin
 
+try:
+    # opcional (está en requirements): libxml2 en C, mucho más rápido que HTMLParser
+    import lxml.html as _lxml_html
+except ImportError:
+    _lxml_html = None
+
 
 _SKIP_IMG_HINTS = (
     "logo",
@@ -20,10 +27,56 @@ _SKIP_IMG_HINTS = (
 )
 
 
+# firmas de binarios que a veces llegan como "HTML" (pdf, gzip sin decodificar, imágenes)
+_BINARY_MAGIC = ("%PDF", "\x1f\x8b", "\x89PNG", "\xff\xd8\xff", "GIF8", "PK\x03\x04")
+
+
+# únicos tags cuyo start le importa a _Parser (el resto solo aporta texto)
+_START_TAGS = frozenset(("title", "meta", "img"))
+
+
+# casos donde el árbol de lxml no da lo mismo que HTMLParser (se pierde o cambia texto):
+# contenido después de </html>, elementos rawtext con contenido y <title> con tags
+# adentro (lxml los deja como markup crudo) y NUL (lxml lo pasa a U+FFFD).
+# Un scan; si matchea, va HTMLParser.
+_RE_LXML_UNSAFE = re.compile(
+    r"\x00"
+    r"|</html\s*>\s*\S"
+    r"|<(textarea|xmp|plaintext|iframe|noembed|noframes)\b[^>]*>(?!\s*</\1)"
+    r"|<title\b[^>]*>[^<]*<(?!/title)",
+    re.IGNORECASE,
+)
+# elementos de texto crudo para lxml: si alguno queda sin cerrar, lxml se traga el
+# resto del documento como texto (JS/CSS en "text", markup en "title")
+_RE_RAW_TAG = re.compile(r"<(/?)(script|style|title|textarea|xmp|iframe|noembed|noframes)\b", re.IGNORECASE)
+
+
+def _lxml_safe(html: str) -> bool:
+    """True si el walk de lxml da lo mismo que HTMLParser (salvo el pegado de texto)."""
+    if _RE_LXML_UNSAFE.search(html):
+        return False
+    # como el tokenizer: dentro de un elemento crudo solo cuenta su propio cierre
+    inside = ""
+    for m in _RE_RAW_TAG.finditer(html):
+        name = m.group(2).lower()
+        if not inside:
+            if not m.group(1):
+                inside = name
+        elif m.group(1) and name == inside:
+            inside = ""
+    return not inside
+
+
+_RE_BIG_IMG = re.compile(r"(1200x630|1080|1920|1600|1280|1024|800)", re.IGNORECASE)
+
+# listas de _score_img como alternations IGNORECASE: un scan por lista, sin .lower()
+_RE_SKIP_IMG = re.compile("|".join(_SKIP_IMG_HINTS), re.IGNORECASE)
+_RE_HERO_IMG = re.compile("hero|header|featured|cover|banner|og|social", re.IGNORECASE)
+_RE_IMG_EXT = re.compile(r"\.(?:jpe?g|png|webp)", re.IGNORECASE)
+
+
 def _norm_space(s: str) -> str:
-    s = (s or "").replace("\u00a0", " ")
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
+    return " ".join((s or "").split())
 
 
 def _abs_url(base_url: str, maybe_url: str) -> str:
@@ -33,45 +86,38 @@ def _abs_url(base_url: str, maybe_url: str) -> str:
     if u.startswith("//"):
         # protocol-relative
         return "https:" + u
-    if u.startswith("http://") or u.startswith("https://"):
+    if u.startswith(("http://", "https://")):
         return u
     return urljoin(base_url, u)
 
 
 def _looks_like_image_url(u: str) -> bool:
-    ul = (u or "").lower()
-    if not ul.startswith("http"):
-        return False
-    # acepta sin extensión también (muchos CMS sirven imágenes sin .jpg)
-    if any(ext in ul for ext in [".jpg", ".jpeg", ".png", ".webp", ".gif"]):
-        return True
-    # algunos usan parámetros, ejemplo: .../image?format=jpg
-    if any(k in ul for k in ["format=jpg", "format=png", "format=webp", "image", "img", "media"]):
-        return True
-    return True
+    # acepta sin extensión también (muchos CMS sirven imágenes sin .jpg, o con
+    # parámetros tipo .../image?format=jpg): basta con que sea http(s)
+    return (u or "")[:4].lower() == "http"
 
 
 def _score_img(u: str) -> int:
     """
     Heurística simple para escoger una imagen “buena”.
     """
-    ul = (u or "").lower()
+    u = u or ""
     score = 0
 
     # penaliza cosas típicas de logos/icons
-    if any(h in ul for h in _SKIP_IMG_HINTS):
+    if _RE_SKIP_IMG.search(u):
         score -= 10
 
     # bonifica cosas típicas de “hero”
-    if any(h in ul for h in ("hero", "header", "featured", "cover", "banner", "og", "social")):
+    if _RE_HERO_IMG.search(u):
         score += 5
 
     # bonifica extensiones “normales”
-    if any(ext in ul for ext in (".jpg", ".jpeg", ".png", ".webp")):
+    if _RE_IMG_EXT.search(u):
         score += 2
 
     # bonifica si parece grande (muy común: 1200x630 etc.)
-    if re.search(r"(1200x630|1080|1920|1600|1280|1024|800)", ul):
+    if _RE_BIG_IMG.search(u):
         score += 2
 
     return score
@@ -92,6 +138,9 @@ class _Parser(HTMLParser):
 
     def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]):
         tag = (tag or "").lower()
+        if tag not in _START_TAGS:
+            # nada más: el texto lo capturamos en handle_data
+            return
         a = {k.lower(): (v or "") for k, v in (attrs or [])}
 
         if tag == "title":
@@ -112,9 +161,6 @@ class _Parser(HTMLParser):
                 u = _abs_url(self.base_url, src)
                 if u and _looks_like_image_url(u):
                     self.images.append(u)
-            return
-
-        # nada más: el texto lo capturamos en handle_data
 
     def handle_endtag(self, tag: str):
         tag = (tag or "").lower()
@@ -133,6 +179,39 @@ class _Parser(HTMLParser):
                 self.text_parts.append(t)
 
 
+def _feed_lxml(p: _Parser, html: str) -> None:
+    """
+    Recorre el árbol de lxml y dispara los mismos handlers de _Parser
+    (start -> text -> hijos -> end -> tail), así la lógica de extracción es una sola.
+    Stack explícito en vez de iterwalk: iterwalk se saltea los comentarios y con
+    ellos su tail (texto real que HTMLParser sí ve).
+    Solo se usa si _lxml_safe(html). NO es idéntico a HTMLParser: el texto separado
+    solo por tags que lxml descarta (cierres sueltos tipo "ab</span>cd", texto antes
+    de <html>, <html>/<body> repetidos) llega pegado ("abcd" en vez de "ab cd"), y
+    un fragmento de 1 caracter que HTMLParser tiraría queda pegado al vecino. Cambia
+    solo el espaciado de "text"; title/meta/imágenes coinciden.
+    """
+    stack = [(_lxml_html.document_fromstring(html), False)]
+    while stack:
+        el, closing = stack.pop()
+        tag = el.tag
+        if closing:
+            if tag == "title":
+                p.handle_endtag(tag)
+        elif isinstance(tag, str):
+            # los atributos solo se copian para title/meta/img (divs, spans, a... no)
+            if tag in _START_TAGS:
+                p.handle_starttag(tag, list(el.attrib.items()))
+            if el.text:
+                p.handle_data(el.text)
+            stack.append((el, True))
+            stack.extend((c, False) for c in reversed(el))
+            continue
+        # comentarios / processing instructions: solo cuenta su tail
+        if el.tail:
+            p.handle_data(el.tail)
+
+
 def parse_page(url: str, html: str) -> dict[str, Any]:
     """
     Parse HTML en un dict homogéneo para el extractor.
@@ -148,15 +227,43 @@ def parse_page(url: str, html: str) -> dict[str, Any]:
     if not url or not html:
         return {}
 
-    p = _Parser(base_url=url)
-    try:
-        p.feed(html)
-    except Exception:
-        # HTML roto: igual devolvemos lo que tengamos
-        pass
+    # fast paths antes de armar parser/árbol
+    if html.startswith(_BINARY_MAGIC):
+        return {}
+    if "<" not in html:
+        # texto plano: lo mismo que daría el parser (un solo bloque de datos)
+        text = _norm_space(unescape(html))
+        return {
+            "url": url,
+            "title": "",
+            "text": text if len(text) >= 2 else "",
+            "meta": {},
+            "og_image": "",
+            "images": [],
+            "html": html,
+        }
+
+    p = None
+    if _lxml_html is not None and _lxml_safe(html):
+        try:
+            p = _Parser(base_url=url)
+            _feed_lxml(p, html)
+        except Exception:
+            # p.ej. str con declaración <?xml encoding=...?>: caemos a HTMLParser
+            p = None
+
+    if p is None:
+        p = _Parser(base_url=url)
+        try:
+            p.feed(html)
+        except Exception:
+            # HTML roto: igual devolvemos lo que tengamos
+            pass
 
     title = _norm_space(" ".join(p.title_parts))
-    text = _norm_space(" ".join(p.text_parts))
+    # cada parte ya viene normalizada (handle_data): el join ya queda normalizado,
+    # sin re-partir todo el texto en palabras
+    text = " ".join(p.text_parts)
 
     # og:image / twitter:image como prioridad
     og = (p.meta.get("og:image") or "").strip()
@@ -164,32 +271,26 @@ def parse_page(url: str, html: str) -> dict[str, Any]:
     og_abs = _abs_url(url, og) if og else ""
     tw_abs = _abs_url(url, tw) if tw else ""
 
-    # dedupe imágenes preservando orden
-    seen = set()
-    imgs: list[str] = []
-    for u in [og_abs, tw_abs] + (p.images or []):
-        u = (u or "").strip()
-        if not u:
-            continue
-        if u in seen:
-            continue
-        seen.add(u)
-        imgs.append(u)
+    # dedupe imágenes preservando orden (dict.fromkeys, una pasada)
+    imgs: list[str] = list(dict.fromkeys(
+        u for u in (x.strip() for x in (og_abs, tw_abs, *p.images)) if u
+    ))
 
-    # escoge “mejor” imagen
+    # escoge “mejor” imagen; max() devuelve la primera con score máximo,
+    # igual que sorted(reverse=True)[0] pero sin ordenar toda la lista
     best = ""
     if og_abs:
         best = og_abs
     elif tw_abs:
         best = tw_abs
     elif imgs:
-        best = sorted(imgs, key=_score_img, reverse=True)[0]
+        best = max(imgs, key=_score_img)
 
     return {
         "url": url,
         "title": title,
         "text": text,
-        "meta": dict(p.meta),
+        "meta": p.meta,  # el parser se descarta: sin copia
         "og_image": best,
         "images": imgs,
         "html": html,  # por si el extractor usa HTML
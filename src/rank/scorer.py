@@ -1,7 +1,8 @@
 import re
+from functools import lru_cache
 from urllib.parse import urlparse
 
-EVENT_VERBS = [
+EVENT_VERBS = (
     # ES/PT
     "convocatoria", "marcha", "manifestación", "manifestacion", "huelga",
     "concentración", "concentracion", "paro", "plantón", "planton",
@@ -16,16 +17,16 @@ EVENT_VERBS = [
     "manifestation", "grève", "greve", "atelier", "conférence",
     "sciopero", "manifestazione", "incontro",
     "streik", "demo", "kundgebung"
-]
+)
 
-IWD_KEYWORDS = [
+IWD_KEYWORDS = (
     "8m", "8 marzo", "8 de marzo", "8 mars", "8 march",
     "international women's day", "international womens day",
     "dia internacional da mulher", "día internacional de la mujer",
     "journee internationale des droits des femmes",
     # algunas variantes comunes
     "womens day", "día de la mujer", "dia da mulher", "journee internationale de la femme"
-]
+)
 
 DATE_HINTS = [
     r"\b20\d{2}-\d{2}-\d{2}\b",
@@ -41,48 +42,77 @@ TIME_HINTS = [
     r"\b(1[0-2]|0?[1-9])(?::([0-5]\d))?\s?(am|pm)\b",
 ]
 
-LOCATION_HINTS = [
+# compilados una vez (antes: re.search con el string en cada llamada)
+_DATE_HINTS_RE = [re.compile(p, re.IGNORECASE) for p in DATE_HINTS]
+# los DATE_HINTS unidos: un scan decide si hace falta contar patrón por patrón
+_DATE_ANY_RE = re.compile("|".join(f"(?:{p})" for p in DATE_HINTS), re.IGNORECASE)
+# TIME_HINTS en un solo regex (un scan); lastgroup dice qué formato matcheó
+_TIME_RE = re.compile(
+    "|".join(f"(?P<{n}>{p})" for n, p in zip(("h24", "hh", "h12"), TIME_HINTS)),
+    re.IGNORECASE,
+)
+
+# gate de un scan para EVENT_VERBS: sin match no hace falta contar palabra por palabra
+_EVENT_VERBS_RE = re.compile("|".join(map(re.escape, EVENT_VERBS)), re.IGNORECASE)
+
+LOCATION_HINTS = (
     "dirección", "direccion", "lugar", "punto de encuentro", "ubicación", "ubicacion",
     "address", "location", "venue", "meet at",
     "lieu", "adresse",
     "indirizzo", "luogo",
     "ort", "treffpunkt"
-]
+)
 
-BAD_PAGE_HINTS = [
+BAD_PAGE_HINTS = (
     "cookie", "privacy", "terms", "sitemap", "newsletter", "subscribe",
     "accessibility", "impressum"
-]
+)
+
+def _alternation(words) -> re.Pattern:
+    # "¿contiene alguna?" en un solo scan en C, sobre el texto original (sin .lower())
+    return re.compile("|".join(map(re.escape, words)), re.IGNORECASE)
+
+URL_IWD_HINTS = ("8m", "iwd", "womens-day", "women-s-day", "dia-da-mulher", "dia-internacional", "8-marzo", "8-mars")
 
-def _contains_any(text: str, needles: list[str]) -> bool:
-    t = (text or "").lower()
-    return any(n.lower() in t for n in needles)
+_IWD_RE = _alternation(IWD_KEYWORDS)
+_URL_IWD_RE = _alternation(URL_IWD_HINTS)
+_LOCATION_RE = _alternation(LOCATION_HINTS)
+_BAD_RE = _alternation(BAD_PAGE_HINTS)
 
-def _count_matches_regex(text: str, patterns: list[str]) -> int:
+def _count_matches_regex(text: str, patterns: list[re.Pattern]) -> int:
     t = text or ""
     c = 0
     for p in patterns:
-        if re.search(p, t, flags=re.IGNORECASE):
+        if p.search(t):
             c += 1
     return c
 
+def _count_words(text_l: str, words, gate: re.Pattern) -> int:
+    # text_l ya en minúsculas; el conteo exacto (solapados incluidos) solo si el gate matchea
+    if not gate.search(text_l):
+        return 0
+    return sum(1 for w in words if w in text_l)
+
 def score_page(url: str, title: str, text: str) -> tuple[int, dict]:
     """
     Score alto = más probable convocatoria 8M real.
     Devuelve (score, signals) para debug.
     """
-    title_l = (title or "").lower()
-    text_l = (text or "").lower()
+    # los regex son IGNORECASE: title/text se bajan a minúsculas recién después
+    # del corte por IWD (la mayoría de las páginas no pasa y no paga la copia)
+    title = title or ""
+    text = text or ""
     url_l = (url or "").lower()
 
     score = 0
     signals = {}
 
     # Señal dura: si no hay 8M/IWD en URL/TITLE/TEXT → casi seguro NO es 8M
-    has_iwd = (
-        _contains_any(title_l, IWD_KEYWORDS)
-        or _contains_any(text_l, IWD_KEYWORDS)
-        or _contains_any(url_l, ["8m", "iwd", "womens-day", "women-s-day", "dia-da-mulher", "dia-internacional", "8-marzo", "8-mars"])
+    # (de lo más barato a lo más caro: url y title cortos, el text recién al final)
+    has_iwd = bool(
+        _URL_IWD_RE.search(url_l)
+        or _IWD_RE.search(title)
+        or _IWD_RE.search(text)
     )
     signals["has_iwd"] = has_iwd
     if not has_iwd:
@@ -91,18 +121,26 @@ def score_page(url: str, title: str, text: str) -> tuple[int, dict]:
 
     score += 8  # base fuerte por ser 8M/IWD
 
-    verbs = sum(1 for v in EVENT_VERBS if v in title_l) + sum(1 for v in EVENT_VERBS if v in text_l)
+    # una copia en minúsculas para los conteos exactos (substrings)
+    title_l = title.lower()
+    text_l = text.lower()
+
+    verbs = _count_words(title_l, EVENT_VERBS, _EVENT_VERBS_RE) + _count_words(text_l, EVENT_VERBS, _EVENT_VERBS_RE)
     signals["event_verbs"] = verbs
     score += min(verbs, 6)
 
-    date_hits = _count_matches_regex(text, DATE_HINTS) + _count_matches_regex(title, DATE_HINTS)
-    time_hits = _count_matches_regex(text, TIME_HINTS)
+    date_hits = 0
+    if _DATE_ANY_RE.search(text) or _DATE_ANY_RE.search(title):
+        date_hits = _count_matches_regex(text, _DATE_HINTS_RE) + _count_matches_regex(title, _DATE_HINTS_RE)
+    time_m = _TIME_RE.search(text)
+    time_hits = 1 if time_m else 0
     signals["date_hits"] = date_hits
     signals["time_hits"] = time_hits
+    signals["time_kind"] = time_m.lastgroup if time_m else ""
     score += 4 if date_hits > 0 else 0
     score += 2 if time_hits > 0 else 0
 
-    loc = _contains_any(text_l, LOCATION_HINTS)
+    loc = bool(_LOCATION_RE.search(text))
     signals["location_hints"] = loc
     score += 2 if loc else 0
 
@@ -119,12 +157,15 @@ def score_page(url: str, title: str, text: str) -> tuple[int, dict]:
     signals["url_bonus"] = url_bonus
     score += url_bonus
 
-    bad = sum(1 for b in BAD_PAGE_HINTS if (b in title_l or b in text_l or b in url_l))
+    bad = 0
+    if _BAD_RE.search(title_l) or _BAD_RE.search(text_l) or _BAD_RE.search(url_l):
+        bad = sum(1 for b in BAD_PAGE_HINTS if (b in title_l or b in text_l or b in url_l))
     signals["bad_hints"] = bad
     score -= min(bad * 2, 6)
 
     return score, signals
 
+@lru_cache(maxsize=65536)
 def domain_of(url: str) -> str:
     try:
         return urlparse(url).netloc.lower()
@@ -0,0 +1,68 @@
+import unittest
+from unittest import mock
+
+from src.parse import html_parser
+from src.parse.html_parser import parse_page
+
+URL = "https://ex.org/"
+
+# entradas donde el árbol de lxml difiere del tokenizer de HTMLParser
+CASES = {
+    "after_html": "<html><body><p>hola</p></body></html><div>footer injected after html</div>",
+    "script_after_html": "<html><body><p>hola</p></body></html><script>var x=1;</script>",
+    "img_after_html": "<html><body><p>hola</p></body></html><img src='/x.png'>",
+    "title_after_html": "<html><body><p>hola</p></body></html><title>tt</title>",
+    "textarea": "<p>hola</p><textarea><b>raw</b></textarea>",
+    "xmp": "<p>hola</p><xmp><b>raw</b></xmp>",
+    "plaintext": "<p>hola</p><plaintext><b>raw</b>",
+    "iframe": "<p>hola</p><iframe><b>raw</b></iframe>",
+    "noembed": "<p>hola</p><noembed><b>raw</b></noembed>",
+    "noframes": "<p>hola</p><noframes><b>raw</b></noframes>",
+    "nul": "<p>ho\x00la</p>",
+    "truncated_script": "<p>hola</p><script>function f(){ return 2023-01-01 }",
+    "truncated_style": "<p>hola</p><style>p { color: red }",
+    "unterminated_title": "<title>8M<meta property='og:image' content='/og.png'><p>hola</p>",
+    "title_with_markup": "<title>8M <b>marcha</b></title><p>hola</p>",
+    "unterminated_textarea": "<p>hola</p><textarea>chau",
+    # estos ya coincidían: que sigan coincidiendo
+    "comment_tail": "<p>hola<!-- c -->chau</p>",
+    "empty_iframe": "<p>hola</p><iframe src='https://v.ex/e'></iframe><p>chau</p>",
+    "meta_img": "<title>8M</title><meta property='og:image' content='/og.png'><img src='/a.jpg'>",
+    "closed_script": "<p>hola</p><script>if (a < b) { x = '</div>' }</script><p>chau</p>",
+}
+
+# diferencia conocida (ver _feed_lxml): lxml descarta estos tags y pega el texto de
+# los dos lados; solo cambia el espaciado de "text"
+GLUED = {
+    "stray_end_tag": "<p>ab</span>cd</p>",
+    "text_before_html": "hola<html><body>chau</body></html>",
+    "repeated_html": "<p>ab<html>cd</p>",
+}
+
+
+@unittest.skipIf(html_parser._lxml_html is None, "lxml no instalado")
+class LxmlMatchesHTMLParserTest(unittest.TestCase):
+    def test_same_output_both_tokenizers(self):
+        for name, html in CASES.items():
+            with self.subTest(name):
+                with_lxml = parse_page(URL, html)
+                with mock.patch.object(html_parser, "_lxml_html", None):
+                    baseline = parse_page(URL, html)
+                self.assertEqual(with_lxml, baseline)
+
+    def test_glued_text_only_differs_in_spacing(self):
+        for name, html in GLUED.items():
+            with self.subTest(name):
+                with_lxml = parse_page(URL, html)
+                with mock.patch.object(html_parser, "_lxml_html", None):
+                    baseline = parse_page(URL, html)
+                self.assertEqual(with_lxml["text"].replace(" ", ""), baseline["text"].replace(" ", ""))
+                with_lxml.pop("text"), baseline.pop("text")
+                self.assertEqual(with_lxml, baseline)
+
+    def test_rawtext_is_parsed_as_text(self):
+        self.assertEqual(parse_page(URL, CASES["textarea"])["text"], "hola raw")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import tempfile
+import unittest
+from unittest import mock
+
+import requests
+
+from src.collect import web_fetch
+from src.collect.discover_links import extract_links_bytes
+
+
+def _latin1_response(url: str) -> requests.Response:
+    r = requests.Response()
+    r.status_code = 200
+    r.url = url
+    r._content = '<a href="/café/ñ">x</a>'.encode("latin-1")
+    r.encoding = "ISO-8859-1"
+    return r
+
+
+class _Session:
+    headers = dict(web_fetch.DEFAULT_HEADERS)
+
+    def get(self, url, **kwargs):
+        return _latin1_response(url)
+
+
+class FetchUrlBytesTest(unittest.TestCase):
+    def test_latin1_links_same_cold_and_warm(self):
+        url = "https://ex.org/"
+        with tempfile.TemporaryDirectory() as d, mock.patch.object(web_fetch, "CACHE_DIR", d):
+            cold = extract_links_bytes(url, web_fetch.fetch_url_bytes(_Session(), url))
+            warm = extract_links_bytes(url, web_fetch.fetch_url_bytes(_Session(), url))
+        self.assertEqual(cold, ["https://ex.org/café/ñ"])
+        self.assertEqual(warm, cold)
+
+    def test_latin1_links_without_cache(self):
+        url = "https://ex.org/"
+        raw = web_fetch.fetch_url_bytes(_Session(), url, use_cache=False)
+        self.assertEqual(extract_links_bytes(url, raw), ["https://ex.org/café/ñ"])
+
+
+if __name__ == "__main__":
+    unittest.main()